@@ -1,13 +1,15 @@
-import numpy as np
 import xarray as xr
-import onnxruntime 
 import argparse
+import functools
 import logging
+import queue
 import sys
+import threading
 import os
+from concurrent.futures import ProcessPoolExecutor
 
 from asar_seastate_processor.processor import generate_l2_wave_product
-from asar_seastate_processor.utils import load_config, get_output_path, format_l2, apply_preprocessing, apply_range_filters, add_quality_indices, save_l2 
+from asar_seastate_processor.utils import load_config, load_model, get_required_variables, get_quantized_model_path, get_output_path, format_l2, apply_preprocessing, apply_range_filters, add_quality_indices, save_l2 
 
 
 def setup_logging(verbose=False):
@@ -30,9 +32,12 @@ def parse_args():
     
     # Other arguments
     parser.add_argument("--overwrite", action="store_true", default=False, help="overwrite the existing outputs")
+    parser.add_argument("--workers", type=int, default=1, help="number of processes used to process files in parallel")
     parser.add_argument("--verbose", action="store_true", default=False)
    
     args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
     return args
 
 
@@ -45,7 +50,9 @@ def main():
     setup_logging(args.verbose)
     
     if args.input_path.endswith('.txt'):
-        listing = np.loadtxt(args.input_path, dtype=str)
+        with open(args.input_path) as f:
+            # Skip empty lines and '#' comments, like np.loadtxt
+            listing = [path for line in f.read().splitlines() if (path := line.split('#', 1)[0].strip())]
     else:
         listing = [args.input_path]
     
@@ -55,46 +62,199 @@ def main():
     
     logging.info("Loading model...")
     model_path = os.path.join(os.path.dirname(__file__), 'models', f'{config["model_name"]}.onnx')
-    model = onnxruntime.InferenceSession(model_path)
-    
-    for path in listing:
-        if not os.path.exists(path):
-            logging.warning(f"File not found: {path}, skipping...")
-            continue
+    if os.path.exists(get_quantized_model_path(model_path)):
+        model_path = get_quantized_model_path(model_path)
+        logging.info(f"Using quantized model: {model_path}")
+
+    if args.workers > 1:
+        _run_parallel(listing, args, config, model_path)
+    else:
+        _run_pipeline(listing, args, config, load_model(model_path))
+
+
+def _run_pipeline(listing, args, config, model):
+    """
+    Read, process and write files in a pipeline so that I/O overlaps with model inference.
+    """
+    read_queue = queue.Queue(maxsize=2)
+    write_queue = queue.Queue(maxsize=2)
+    reader = threading.Thread(
+        target=_read_stage,
+        args=(
+            listing, args.save_directory, args.file_version, args.overwrite,
+            get_required_variables(config), read_queue
+        ),
+        daemon=True
+    )
+    writer = threading.Thread(
+        target=_write_stage, args=(write_queue, config.get('chunksizes')), daemon=True
+    )
+    reader.start()
+    writer.start()
+
+    while (item := read_queue.get()) is not None:
+        if isinstance(item, BaseException):
+            # Reader failure outside of a single file: stop the writer and report it
+            write_queue.put(None)
+            writer.join()
+            raise item
+
+        path, output_path, asa_l1b = item
 
-        output_path = get_output_path(args.save_directory, path, args.file_version)
-        
-        if os.path.exists(output_path) and not args.overwrite:
-            logging.info(
-                f"{output_path} already exists. Use --overwrite to overwrite."
-            )
-            continue
-        
         logging.info(f"Processing file...")
         try:
-            asa_l1b = xr.open_dataset(path).sel(pol='VV')
-            asa_l1b = apply_preprocessing(asa_l1b, config.get('preprocessing'))
-            asa_l2 = generate_l2_wave_product(
-                asa_l1b,
-                model,
-                config['inputs'],
-                config['outputs'],
-                config['kept_variables']
-            )
-            asa_l2 = apply_range_filters(asa_l1b, asa_l2, config.get('range_filters'))
-            asa_l2 = format_l2(asa_l2, os.path.basename(path), config['attributes'])
-            asa_l2 = add_quality_indices(asa_l2, config.get('quality_variables'))
-            asa_l2 = asa_l2.reset_coords(["line", "sample"], drop=True)
+            asa_l2 = _process_l1b(asa_l1b, path, model, config)
             logging.info(f"Processing completed successfully for {path}")
-            
-            logging.info("Saving L2 file...")
-            save_l2(asa_l2, output_path)
-            logging.info(f"L2 file saved: {output_path}")
-            
         except Exception as e:
             logging.error(f"Error processing {path}: {str(e)}")
-            continue        
+            continue
+
+        write_queue.put((path, output_path, asa_l2))
+
+    write_queue.put(None)
+    reader.join()
+    writer.join()
+
+
+def _run_parallel(listing, args, config, model_path):
+    """
+    Process files independently in a pool of processes, each one holding its own ONNX session.
+    """
+    # Share CPUs between workers to avoid oversubscription by the ONNX Runtime threads
+    intra_op_num_threads = max(1, os.cpu_count() // args.workers)
+    process_one = functools.partial(
+        _process_one,
+        config=config,
+        save_directory=args.save_directory,
+        file_version=args.file_version,
+        overwrite=args.overwrite
+    )
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=_init_worker,
+        initargs=(model_path, intra_op_num_threads, args.verbose)
+    ) as executor:
+        list(executor.map(process_one, listing, chunksize=4))
+
+
+_WORKER_MODEL = None
+
+
+def _init_worker(model_path, intra_op_num_threads, verbose):
+    """
+    Initialize a worker process with its own logging and ONNX session.
+    """
+    global _WORKER_MODEL
+    setup_logging(verbose)
+    _WORKER_MODEL = load_model(model_path, intra_op_num_threads)
+
+
+def _process_one(path, config, save_directory, file_version, overwrite):
+    """
+    Read, process and write a single file in a worker process.
+    """
+    try:
+        output_path = _get_output_path_to_process(path, save_directory, file_version, overwrite)
+        if output_path is None:
+            return
 
+        logging.info(f"Processing file...")
+        asa_l1b = _load_l1b(path, get_required_variables(config))
+        asa_l2 = _process_l1b(asa_l1b, path, _WORKER_MODEL, config)
+        logging.info(f"Processing completed successfully for {path}")
+
+        logging.info("Saving L2 file...")
+        save_l2(asa_l2, output_path, config.get('chunksizes'))
+        logging.info(f"L2 file saved: {output_path}")
+
+    except Exception as e:
+        logging.error(f"Error processing {path}: {str(e)}")
+
+
+def _get_output_path_to_process(path, save_directory, file_version, overwrite):
+    """
+    Get the output path of a L1B/L1C file, or None if the file is missing or its output already exists.
+    """
+    if not os.path.exists(path):
+        logging.warning(f"File not found: {path}, skipping...")
+        return None
+
+    output_path = get_output_path(save_directory, path, file_version)
+    
+    if os.path.exists(output_path) and not overwrite:
+        logging.info(
+            f"{output_path} already exists. Use --overwrite to overwrite."
+        )
+        return None
+
+    return output_path
+
+
+def _load_l1b(path, variables=None):
+    """
+    Load the VV polarization of a L1B/L1C file in memory, restricted to the given variables if provided.
+    """
+    with xr.open_dataset(path) as asa_l1b:
+        if variables is not None:
+            asa_l1b = asa_l1b[[v for v in variables if v in asa_l1b.variables]]
+        return asa_l1b.sel(pol='VV').load()
+
+
+def _read_stage(listing, save_directory, file_version, overwrite, variables, read_queue):
+    """
+    Load the L1B/L1C files that need processing and put them in the read queue.
+    Errors on a file are logged and the file is skipped, other failures are put in the queue for the main thread.
+    A None sentinel is always put in the queue once reading stops.
+    """
+    try:
+        for path in listing:
+            try:
+                output_path = _get_output_path_to_process(path, save_directory, file_version, overwrite)
+                if output_path is None:
+                    continue
+                asa_l1b = _load_l1b(path, variables)
+            except Exception as e:
+                logging.error(f"Error reading {path}: {str(e)}")
+                continue
+
+            read_queue.put((path, output_path, asa_l1b))
+    except BaseException as e:
+        read_queue.put(e)
+    finally:
+        read_queue.put(None)
+
+
+def _process_l1b(asa_l1b, path, model, config):
+    """
+    Generate the formatted L2 WAVE product of a L1B/L1C dataset.
+    """
+    asa_l1b = apply_preprocessing(asa_l1b, config.get('preprocessing'))
+    asa_l2 = generate_l2_wave_product(
+        asa_l1b,
+        model,
+        config['inputs'],
+        config['outputs'],
+        config['kept_variables']
+    )
+    asa_l2 = apply_range_filters(asa_l1b, asa_l2, config.get('range_filters'))
+    asa_l2 = format_l2(asa_l2, os.path.basename(path), config['attributes'])
+    asa_l2 = add_quality_indices(asa_l2, config.get('quality_variables'))
+    return asa_l2
+
+
+def _write_stage(write_queue, chunksizes=None):
+    """
+    Save the L2 products put in the write queue until a None sentinel is received.
+    """
+    while (item := write_queue.get()) is not None:
+        path, output_path, asa_l2 = item
+
+        logging.info("Saving L2 file...")
+        try:
+            save_l2(asa_l2, output_path, chunksizes)
+            logging.info(f"L2 file saved: {output_path}")
+        except Exception as e:
+            logging.error(f"Error saving {path}: {str(e)}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
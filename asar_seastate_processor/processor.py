@@ -1,10 +1,22 @@
 import xarray as xr
 import numpy as np
+import os
 from datetime import datetime
 
 
+ONNX_DTYPES = {
+    'tensor(float)': np.float32,
+    'tensor(float16)': np.float16,
+}
+
+BATCH_SIZE = 4096
+
+L2_REF_PATH = os.path.join(os.path.dirname(__file__), 'l2_ref.nc')
+_L2_REF_CACHE = None
+
+
 def generate_l2_wave_product(
-    ds, model, model_inputs, model_outputs, kept_variables=[]
+    ds, model, model_inputs, model_outputs, kept_variables=[], l2_ref=None
 ):
     """
     Generate a level-2 wave (L2 WAV) product from an input L1B/C dataset.
@@ -15,14 +27,15 @@ def generate_l2_wave_product(
         model_inputs (list of str): List of variables inputted to the model.
         model_outputs (list of str): List of variables predicted by the model.
         kept_variables (list of str): List of variables from the input dataset that are kept in the final product. Defaults to an empty list.
+        l2_ref (xarray.Dataset): Reference level-2 dataset used for land-only products. Defaults to the cached l2_ref.nc, looked up next to the package then in the current working directory.
 
     Returns:
         l2_product (xarray.Dataset): Level-2 wave product.
     """
     # Pass dataset to another function if product acquisitions are on land only
-    if ds.land_flag.all():
-        config_path = 'l2_ref.nc'
-        l2_ref = xr.open_dataset(config_path)
+    if _is_land_only(ds['land_flag']):
+        if l2_ref is None:
+            l2_ref = _get_l2_ref()
         ds = generate_product_on_land(ds, l2_ref, model_outputs, kept_variables)
         
     # Stack tiles if cwaves are in model inputs to allow predictions
@@ -31,59 +44,116 @@ def generate_l2_wave_product(
     else:
         ds_input = ds 
 
-    # Prepare input arrays and make predictions
-    input_arrays = [ds_input[v] for v in model_inputs]
-    predictions = xr.apply_ufunc(
-        predict_variables,
-        model,
-        *input_arrays,
-        input_core_dims=[[], *[a.dims for a in input_arrays]],
-        output_core_dims=[['preds', 'time']],
-        vectorize=False
+    # Make predictions for all tiles at once and format them accordingly to model outputs
+    # (tiles are moved to the first axis whatever the dimension order of the input variables)
+    predictions = predict_variables(
+        model, *[ds_input[v].transpose('time', ...).values for v in model_inputs]
+    )
+    time_coords = {
+        name: coord for name, coord in ds_input.coords.items()
+        if set(coord.dims) <= {'time'}
+    }
+    predictions = xr.Dataset(
+        {
+            variable_label: (('time', ), predictions[i])
+            for i, variable_label in enumerate(model_outputs)
+        },
+        coords=time_coords
     )
-
-    # Format predictions accordingly to model outputs
-    predictions = xr.Dataset({
-        variable_label: predictions.sel(preds=i)
-        for i, variable_label in enumerate(model_outputs)
-    })
 
     # Finish formatting l2 product
     l2_product = xr.merge([ds[kept_variables], predictions], compat='override')
+    tile_coords = [c for c in ("line", "sample") if c in l2_product.coords]
+    if tile_coords:
+        l2_product = l2_product.reset_coords(tile_coords, drop=True)
 
     return l2_product
 
     
 def predict_variables(
-    model, *input_arrays
+    model, *input_arrays, batch_size=BATCH_SIZE
 ):
     """
     Launch predictions using a neural model.
 
     Args:
         model (onnxruntime.InferenceSession): ML model used for prediction.
-        input_arrays (array like): Arrays containing the input data for ML predictions.
+        input_arrays (numpy.ndarray): Arrays containing the input data for ML predictions, with tiles along the first axis.
+        batch_size (int): Number of tiles passed to the model at once. Defaults to BATCH_SIZE.
 
     Returns:
-        res (tuple): Tuple containing predictions for each variable.
+        res (list of numpy.ndarray): List containing predictions for each variable.
     """
-    # Reshape input arrays to allow concatenation
-    reshaped_vars = [
-        data[:, np.newaxis] if data.ndim == 1 else data
-        for data in input_arrays
+    # Number of features brought by each input array once flattened
+    n_samples = input_arrays[0].shape[0]
+    widths = [int(np.prod(data.shape[1:])) for data in input_arrays]
+
+    # Copy inputs side by side into a single contiguous matrix of the model input type,
+    # casting on the fly
+    model_input = getattr(model, '_cached_input', None) or model.get_inputs()[0]
+    X_stacked = np.empty((n_samples, sum(widths)), dtype=ONNX_DTYPES.get(model_input.type, np.float32))
+    col = 0
+    for data, width in zip(input_arrays, widths):
+        np.copyto(X_stacked[:, col:col + width], data.reshape(n_samples, width), casting='unsafe')
+        col += width
+
+    # Run the model on fixed-size batches, so that ONNX Runtime can reuse its memory pattern,
+    # binding inputs and preallocated output buffers to avoid copies in and out of the session
+    output_nodes = getattr(model, '_cached_outputs', None) or model.get_outputs()
+    outputs = [
+        np.empty((n_samples, ) + tuple(o.shape[1:]), dtype=ONNX_DTYPES.get(o.type, np.float32))
+        for o in output_nodes
     ]
+    binding = getattr(model, '_cached_io_binding', None) or model.io_binding()
+    for start in range(0, n_samples, batch_size):
+        binding.bind_cpu_input(model_input.name, X_stacked[start:start + batch_size])
+        for node, output in zip(output_nodes, outputs):
+            output_batch = output[start:start + batch_size]
+            binding.bind_output(
+                node.name, 'cpu', 0, output_batch.dtype, output_batch.shape, output_batch.ctypes.data
+            )
+        model.run_with_iobinding(binding)
+    # Release the buffers held by a binding reused across calls
+    binding.clear_binding_inputs()
+    binding.clear_binding_outputs()
 
-    # Concatenate along the second axis (axis=1)
-    X_stacked = np.concatenate(reshaped_vars, axis=1)
+    res = [r[:, i] for r in outputs for i in range(r.shape[-1])]
+    return res
 
-    # Prepare inputs for the model
-    input_name = model.get_inputs()[0].name
-    inputs = {input_name: X_stacked.astype(np.float32)}
 
-    res = model.run(None, inputs)
+def _is_land_only(land_flag):
+    """
+    Check whether all tiles were acquired on land, stopping at the first chunk containing ocean tiles for dask arrays.
 
-    res = [r[:, i] for r in res for i in range(r.shape[-1])]
-    return res
+    Args:
+        land_flag (xarray.DataArray): Land flag of the tiles.
+
+    Returns:
+        bool: True if all tiles are on land.
+    """
+    if land_flag.size == 0:
+        return False
+
+    if hasattr(land_flag.data, 'blocks'):
+        return all(bool(block.all().compute()) for block in land_flag.data.blocks.ravel())
+
+    return bool(np.asarray(land_flag.values, dtype=bool).all())
+
+
+def _get_l2_ref():
+    """
+    Load the reference level-2 dataset in memory once and return it on subsequent calls.
+
+    Returns:
+        xarray.Dataset: Reference level-2 dataset.
+    """
+    global _L2_REF_CACHE
+    if _L2_REF_CACHE is None:
+        # Fall back to the current working directory when no reference is shipped with the package
+        path = L2_REF_PATH if os.path.exists(L2_REF_PATH) else 'l2_ref.nc'
+        with xr.open_dataset(path) as l2_ref:
+            _L2_REF_CACHE = l2_ref.load()
+    return _L2_REF_CACHE
 
 
 def generate_product_on_land(
@@ -118,7 +188,8 @@ def generate_product_on_land(
                 l2_ref.sizes[dim] if dim!='time' else ds_land.sizes['time']
                 for dim in var_dims
             )
-            l2_land[var] = (var_dims, np.full(var_shape, np.nan))
+            var_dtype = l2_ref[var].dtype if np.issubdtype(l2_ref[var].dtype, np.floating) else np.float32
+            l2_land[var] = (var_dims, np.full(var_shape, np.nan, dtype=var_dtype))
             l2_land[var].attrs = l2_ref[var].attrs
 
     # Manage coordinates 
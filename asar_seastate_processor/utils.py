@@ -1,14 +1,36 @@
+import functools
+import hashlib
+import json
 import numpy as np
 import xarray as xr
 import os
+import time
 import yaml
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
+from types import MappingProxyType
+
+# libyaml-based loader, bundled with PyYAML wheels, with a fallback on the pure Python one
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+_CONFIG_CACHE = {}
 
 
 def load_config(config_path):
     """
     Load configuration from YAML file.
+    The parsed configuration is cached until the file changes, callers must not mutate it.
+    A JSON copy of the configuration is saved in the user cache directory and read instead of the
+    YAML file as long as the YAML file keeps the modification time and size recorded in the copy.
     
     Args:
         config_path (str): Path to configuration file to generate L2 product.
@@ -16,8 +38,181 @@ def load_config(config_path):
     Returns
         dict: Loaded configuration 
     """
-    with open(config_path, 'r') as f:
-        return yaml.safe_load(f)
+    st = os.stat(config_path)
+    key = (os.path.abspath(config_path), st.st_mtime_ns, st.st_size)
+    if key in _CONFIG_CACHE:
+        return _CONFIG_CACHE[key]
+
+    json_path = _get_json_config_path(key[0])
+    config = _load_json_config(json_path, st)
+    if config is None:
+        with open(config_path, 'rb') as f:
+            config = yaml.load(f.read(), Loader=_YamlLoader)
+        _save_json_config(config, json_path, st)
+
+    _CONFIG_CACHE[key] = config
+    return config
+
+
+def _get_json_config_path(config_path):
+    """
+    Get the path of the JSON copy of a configuration, in the user cache directory ($XDG_CACHE_HOME, ~/.cache by default).
+
+    Args:
+        config_path (str): Absolute path of the YAML configuration file.
+
+    Returns:
+        str: Path of the JSON copy, named after a hash of the YAML path.
+    """
+    cache_directory = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser(os.path.join('~', '.cache'))
+    filename = f"{hashlib.sha256(config_path.encode()).hexdigest()}.json"
+    return os.path.join(cache_directory, 'asar_seastate_processor', filename)
+
+
+def _json_loads(data):
+    """Parse JSON bytes with orjson if available, with the standard library otherwise."""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _load_json_config(json_path, yaml_stat):
+    """
+    Load the JSON copy of a configuration if it was generated from the current version of the YAML file.
+
+    Args:
+        json_path (str): Path of the JSON copy.
+        yaml_stat (os.stat_result): Status of the YAML file.
+
+    Returns:
+        dict: Loaded configuration, or None if the copy is missing, unreadable or stale.
+    """
+    try:
+        with open(json_path, 'rb') as f:
+            content = _json_loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(content, dict) or content.get('source') != [yaml_stat.st_mtime_ns, yaml_stat.st_size]:
+        return None
+    return content.get('config')
+
+
+def _save_json_config(config, json_path, yaml_stat):
+    """
+    Save a JSON copy of a configuration, if it can be written and represents the configuration exactly.
+    The modification time and size of the YAML file are stored with it to detect stale copies.
+
+    Args:
+        config (dict): Configuration loaded from YAML.
+        json_path (str): Path of the JSON copy.
+        yaml_stat (os.stat_result): Status of the YAML file.
+    """
+    content = {'source': [yaml_stat.st_mtime_ns, yaml_stat.st_size], 'config': config}
+    try:
+        data = orjson.dumps(content) if orjson is not None else json.dumps(content).encode()
+    except TypeError:
+        return
+    if _json_loads(data) != content:
+        return
+
+    # Write to a temporary file first so that concurrent processes never read a partial file
+    tmp_path = f"{json_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(json_path), exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, json_path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_model(model_path, intra_op_num_threads=None):
+    """
+    Load an ONNX model in an inference session tuned for batched CPU inference.
+
+    Args:
+        model_path (str): Path to the ONNX model.
+        intra_op_num_threads (int): Number of threads used within operators. Defaults to the number of CPUs.
+
+    Returns:
+        onnxruntime.InferenceSession: Inference session of the model.
+    """
+    # Imported here so that command line parsing does not pay for the onnxruntime import
+    import onnxruntime
+
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.intra_op_num_threads = intra_op_num_threads or os.cpu_count()
+    options.inter_op_num_threads = 1
+    options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+    options.enable_mem_pattern = True
+    options.enable_cpu_mem_arena = True
+
+    # Set providers explicitly to skip providers autodetection
+    providers = ['CPUExecutionProvider']
+    if 'CUDAExecutionProvider' in onnxruntime.get_available_providers():
+        providers.insert(0, 'CUDAExecutionProvider')
+
+    session = onnxruntime.InferenceSession(model_path, sess_options=options, providers=providers)
+
+    # Cache input and output metadata and the IOBinding to skip their creation for every prediction
+    session._cached_input = session.get_inputs()[0]
+    session._cached_outputs = session.get_outputs()
+    session._cached_io_binding = session.io_binding()
+    return session
+
+
+def quantize_model(model_path, output_path=None):
+    """
+    Quantize the weights of an ONNX model to int8 (post-training dynamic quantization).
+    The quantized model must be validated against the reference model outputs before being used in production.
+
+    Args:
+        model_path (str): Path to the ONNX model.
+        output_path (str): Path to save the quantized model. Defaults to model_path with the '.int8.onnx' suffix.
+
+    Returns:
+        str: Path to the quantized model.
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    if output_path is None:
+        output_path = get_quantized_model_path(model_path)
+
+    quantize_dynamic(model_path, output_path, weight_type=QuantType.QInt8)
+    return output_path
+
+
+def get_quantized_model_path(model_path):
+    """
+    Get the path of the int8 variant of an ONNX model.
+
+    Args:
+        model_path (str): Path to the ONNX model.
+
+    Returns:
+        str: Path to the quantized model.
+    """
+    return f"{os.path.splitext(model_path)[0]}.int8.onnx"
+
+
+def get_required_variables(config):
+    """
+    List the variables of the L1B/L1C files needed to generate the L2 product.
+
+    Args:
+        config (dict): Configuration to generate L2 product.
+
+    Returns:
+        list of str: Names of the required variables.
+    """
+    required = [
+        *config['inputs'],
+        *config['kept_variables'],
+        *(config.get('range_filters') or {}).keys(),
+        'land_flag', 'time', 'longitude', 'latitude', 'pol'
+    ]
+    return list(dict.fromkeys(required))
 
 
 def get_output_path(output_directory, path, file_version, date_directories=True):
@@ -36,20 +231,159 @@ def get_output_path(output_directory, path, file_version, date_directories=True)
     filename = os.path.basename(path)
     # filename = "".join([filename[:-6], f"{product_id.upper()}.nc"]) # Ifremer local version
     # filename = filename.replace("_WVI_XSP", "_WVI_WAV") # Ifremer local version
-    filename_cci = "ESACCI-SEASTATE-L2P-ISSP-ENVISAT_ASAR_WV_IFR-%s-fv01.nc" % filename[18:33].replace('_', 'T')
+    filename_cci = f"ESACCI-SEASTATE-L2P-ISSP-ENVISAT_ASAR_WV_IFR-{filename[18:33].replace('_', 'T')}-fv01.nc"
     
     # Add year/day_of_year between the output_dir and the filename
     if date_directories:
-        date_str = filename[18:26]
-        date = datetime.strptime(date_str, "%Y%m%d")
-        year, day_of_year = date.year, date.timetuple().tm_yday
+        year, day_of_year = _year_and_day_of_year(filename[18:26])
+        return os.path.join(output_directory, str(year), f"{day_of_year:03d}", filename_cci)
 
-        save_dir = os.path.join(output_directory, str(year), f"{day_of_year:03d}")
-    else:
-        save_dir = output_directory
+    return os.path.join(output_directory, filename_cci)
 
-    save_path = os.path.join(save_dir, filename_cci)
-    return save_path
+
+# Number of days in each month and before the first day of each month in a non-leap year
+_MONTH_DAYS = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+_CUMULATIVE_MONTH_DAYS = (0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334)
+
+
+@functools.lru_cache(maxsize=None)
+def _year_and_day_of_year(date_str):
+    """
+    Get the year and day of year of a YYYYMMDD date string.
+
+    Args:
+        date_str (str): Date formatted as YYYYMMDD.
+
+    Returns:
+        tuple of int: Year and day of year.
+    """
+    year, month, day = int(date_str[0:4]), int(date_str[4:6]), int(date_str[6:8])
+    if not 1 <= month <= 12:
+        raise ValueError(f"Invalid month in date {date_str!r}")
+
+    is_leap_year = (year % 4 == 0 and year % 100 != 0) or year % 400 == 0
+    days_in_month = _MONTH_DAYS[month - 1] + (1 if month == 2 and is_leap_year else 0)
+    if not 1 <= day <= days_in_month:
+        raise ValueError(f"Invalid day in date {date_str!r}")
+
+    return year, _CUMULATIVE_MONTH_DAYS[month - 1] + day + (1 if month > 2 and is_leap_year else 0)
+
+
+_TIME_ATTRS = MappingProxyType({
+    "standard_name": "time",
+    "authority": "CF-1.11, ACDD-1.3",
+    "axis": "T",
+    "long_name": "time of measurement",
+    "coverage_content_type": "coordinate"
+})
+
+_LON_ATTRS = MappingProxyType({
+    "units": "degrees_east",
+    "long_name": "longitude",
+    "standard_name": "longitude",
+    "comment": "geographical coordinates, WGS84 projection",
+    "authority": "CF-1.11, ACDD-1.3",
+    "axis": "X",
+    "valid_range": "-180 180",
+    "coverage_content_type": "coordinate"
+})
+
+_LAT_ATTRS = MappingProxyType({
+    "units": "degrees_north",
+    "long_name": "latitude",
+    "standard_name": "latitude",
+    "comment": "geographical coordinates, WGS84 projection",
+    "authority": "CF-1.11, ACDD-1.3",
+    "axis": "Y",
+    "valid_range": "-90 90",
+    "coverage_content_type": "coordinate"
+})
+
+# Global attributes of the L2 products, None values are set per product in format_l2
+_GLOBAL_ATTRS_TEMPLATE = MappingProxyType({
+    "title": "ESA CCI Sea State L2P from ASAR wave mode (WV) onboard Envisat",
+    "id": "ESACCI-SEASTATE-L2P-ISSP-ENVISAT_ASAR_WV_IFR-v1",
+    "summary": "This dataset contains estimates of significant wave height, windsea significant wave height and mean wave period data derived from Level 1 ASAR measurements.",
+    "platform": "Envisat",
+    "instrument": "ASAR",
+    "band": "C",
+    "polarization": None,
+    "spatial_resolution": "5x10km",
+    "creation_date": None,
+    "history": None,
+    "track_id": None,
+    "geospatial_lat_min": -80.0,
+    "geospatial_lat_max": 80.0,
+    "geospatial_lon_min": -180.0,
+    "geospatial_lon_max": 180.0,
+    "cycle": None,
+    "relative_pass_number": None,
+    "cdm_data_type": "trajectory",
+    "featureType": "trajectory",
+    "naming_authority": "cersat.ifremer.fr",
+    "keywords": "Oceans > Ocean Waves > Significant Wave Height, Oceans > Ocean Waves > Sea State",
+    "key_variables": "swh, windwave_swh, Tm0",
+    "processing_level": "L2P",
+    "comment": "These data were produced at Ifremer as part of the ESA ST CCI project",
+    "platform_type": "low earth orbit satellite",
+    "instrument_type": "synthetic aperture radar (sar)",
+    "Conventions": "CF-1.11, ACDD-1.3, ISO 8601",
+    "standard_name_vocabulary": "Climate and Forecast (CF) Standard Name Table v79",
+    "Metadata_Conventions": "Climate and Forecast (CF) 1.7, Attribute Convention for Data Discovery (ACDD) 1.3",
+    "keywords_vocabulary": "NASA Global Change Master Directory (GCMD) Science Keywords",
+    "format_version": "Data Standards v2.1",
+    "platform_vocabulary": "CEOS mission table",
+    "instrument_vocabulary": "CEOS instrument table",
+    "institution": "Institut Francais de Recherche pour l'Exploitation de la mer / Centre d'Exploitation et de Recherche Satellitaire, European Space Agency",
+    "institution_abbreviation": "Ifremer / CERSAT, ESA",
+    "project": "Climate Change Initiative - Sea State (CCI SeaState)",
+    "program": "Climate Change Initiative - European Space Agency",
+    "license": "ESA CCI Data Policy - free and open access",
+    "acknowledgment": "Please acknowledge the use of these data with the following statement: these data were obtained from the ESA CCI Sea State project",
+    "publisher_name": "Ifremer / CERSAT",
+    "publisher_url": "http://cersat.ifremer.fr",
+    "publisher_email": "cersat@ifremer.fr",
+    "publisher_institution": "Ifremer",
+    "publisher_type": "institution",
+    "creator_name": "CERSAT",
+    "creator_url": "http://cersat.ifremer.fr",
+    "creator_email": "cersat@ifremer.fr",
+    "creator_type": "institution",
+    "creator_institution": "Ifremer",
+    "contributor_name": "Fréderic Nouguier",
+    "contributor_role": "principal investigator",
+    "references": "?",
+    "contact": "jfpiolle@ifremer.fr",
+    "technical_support_contact": "cersat@ifremer.fr",
+    "scientific_support_contact": "frederic.nouguier@ifremer.fr",
+    "processing_software": "Ifremer ASAR Level-2 seastate processor",
+    "product_version": "1.0",
+    "source": "Ifremer CCI Sea State L2P ASAR Processor",
+    "source_version": "1.0",
+    "geospatial_bounds": "POLYGON ((-180.0 -80.0, 180.0 -80.0, 180.0 80.0, -180.0 80.0, -180.0 -80.0))",
+    "geospatial_bounds_crs": "EPSG:4326",
+    "geospatial_bounds_vertical_crs": "EPSG:5831",
+    "geospatial_lat_units": "degrees_north",
+    "geospatial_lon_units": "degrees_east",
+    "geospatial_vertical_min": 0.0,
+    "geospatial_vertical_max": 0.0,
+    "time_coverage_start": None,
+    "time_coverage_end": None,
+})
+
+
+@functools.lru_cache(maxsize=1)
+def _creation_date(timestamp):
+    """
+    Format a creation date as an ISO 8601 UTC string, computed once per second of processing.
+
+    Args:
+        timestamp (int): POSIX timestamp in seconds.
+
+    Returns:
+        str: Creation date formatted as YYYY-MM-DDTHH:MM:SSZ.
+    """
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
 
 def format_l2(ds, input_path, attributes):
@@ -69,118 +403,33 @@ def format_l2(ds, input_path, attributes):
         - Complete global attributes following ACDD-1.3 conventions;
         - ESA CCI Sea State project metadata.
     """
-    # Add attributes to the predicted variables
-    for var in attributes.keys():
-        ds[var].attrs = attributes[var]
+    # Add attributes to the predicted variables, directly on the variables to skip DataArray construction
+    for var, var_attributes in attributes.items():
+        ds.variables[var].attrs = var_attributes
 
     # Make longitude and latitude name compliant with the format
     ds = ds.rename({'longitude': 'lon', 'latitude': 'lat'}) # might not be needed anymore if xsarslc is updated
     pol = ds["pol"].item()
     ds = ds.drop_vars("pol")
     
-    ds.time.attrs = {
-        "standard_name": "time",
-        "authority": "CF-1.11, ACDD-1.3",
-        "axis": "T",
-        "long_name": "time of measurement",
-        "coverage_content_type": "coordinate"
-    }
-    
-    ds.lon.attrs = {
-        "units": "degrees_east",
-        "long_name": "longitude",
-        "standard_name": "longitude",
-        "comment": "geographical coordinates, WGS84 projection",
-        "authority": "CF-1.11, ACDD-1.3",
-        "axis": "X",
-        "valid_range": "-180 180",
-        "coverage_content_type": "coordinate"
-    }    	
-
-    ds.lat.attrs = {
-        "units": "degrees_north",
-        "long_name": "latitude",
-        "standard_name": "latitude",
-        "comment": "geographical coordinates, WGS84 projection",
-        "authority": "CF-1.11, ACDD-1.3",
-        "axis": "Y",
-        "valid_range": "-90 90",
-        "coverage_content_type": "coordinate"
-    }
+    ds.variables['time'].attrs = _TIME_ATTRS
+    ds.variables['lon'].attrs = _LON_ATTRS
+    ds.variables['lat'].attrs = _LAT_ATTRS
     
-    # Add global attributes to the dataset
-    creation_date = datetime.today().strftime("%Y-%m-%dT%H:%M:%S:%f")
+    # Add global attributes to the dataset
+    creation_date = _creation_date(int(time.time()))
     
-    global_attributes = {
-        "title": "ESA CCI Sea State L2P from ASAR wave mode (WV) onboard Envisat",
-        "id": "ESACCI-SEASTATE-L2P-ISSP-ENVISAT_ASAR_WV_IFR-v1",
-        "summary": "This dataset contains estimates of significant wave height, windsea significant wave height and mean wave period data derived from Level 1 ASAR measurements.",
-        "platform": "Envisat",
-        "instrument": "ASAR",
-        "band": "C",
+    global_attributes = _GLOBAL_ATTRS_TEMPLATE.copy()
+    global_attributes.update({
         "polarization": pol,
-        "spatial_resolution": "5x10km",
         "creation_date": creation_date,
         "history": f"{creation_date} - Creation",
         "track_id": str(uuid.uuid4()),
-        "geospatial_lat_min": -80.0,
-        "geospatial_lat_max": 80.0,
-        "geospatial_lon_min": -180.0,
-        "geospatial_lon_max": 180.0,
         "cycle": int(input_path[43:46]),
         "relative_pass_number": int(input_path[47:52]),
-        "cdm_data_type": "trajectory",
-        "featureType": "trajectory",
-        "naming_authority": "cersat.ifremer.fr",
-        "keywords": "Oceans > Ocean Waves > Significant Wave Height, Oceans > Ocean Waves > Sea State",
-        "key_variables": "swh, windwave_swh, Tm0",
-        "processing_level": "L2P",
-        "comment": "These data were produced at Ifremer as part of the ESA ST CCI project",
-        "platform_type": "low earth orbit satellite",
-        "instrument_type": "synthetic aperture radar (sar)",
-        "Conventions": "CF-1.11, ACDD-1.3, ISO 8601",
-        "standard_name_vocabulary": "Climate and Forecast (CF) Standard Name Table v79",
-        "Metadata_Conventions": "Climate and Forecast (CF) 1.7, Attribute Convention for Data Discovery (ACDD) 1.3",
-        "keywords_vocabulary": "NASA Global Change Master Directory (GCMD) Science Keywords",
-        "format_version": "Data Standards v2.1",
-        "platform_vocabulary": "CEOS mission table",
-        "instrument_vocabulary": "CEOS instrument table",
-        "institution": "Institut Francais de Recherche pour l'Exploitation de la mer / Centre d'Exploitation et de Recherche Satellitaire, European Space Agency",
-        "institution_abbreviation": "Ifremer / CERSAT, ESA",
-        "project": "Climate Change Initiative - Sea State (CCI SeaState)",
-        "program": "Climate Change Initiative - European Space Agency",
-        "license": "ESA CCI Data Policy - free and open access",
-        "acknowledgment": "Please acknowledge the use of these data with the following statement: these data were obtained from the ESA CCI Sea State project",
-        "publisher_name": "Ifremer / CERSAT",
-        "publisher_url": "http://cersat.ifremer.fr",
-        "publisher_email": "cersat@ifremer.fr",
-        "publisher_institution": "Ifremer",
-        "publisher_type": "institution",
-        "creator_name": "CERSAT",
-        "creator_url": "http://cersat.ifremer.fr",
-        "creator_email": "cersat@ifremer.fr",
-        "creator_type": "institution",
-        "creator_institution": "Ifremer",
-        "contributor_name": "Fréderic Nouguier",
-        "contributor_role": "principal investigator",
-        "references": "?",
-        "contact": "jfpiolle@ifremer.fr",
-        "technical_support_contact": "cersat@ifremer.fr",
-        "scientific_support_contact": "frederic.nouguier@ifremer.fr",
-        "processing_software": "Ifremer ASAR Level-2 seastate processor",
-        "product_version": "1.0",
-        "source": "Ifremer CCI Sea State L2P ASAR Processor",
-        "source_version": "1.0",
-        "geospatial_bounds": "POLYGON ((-180.0 -80.0, 180.0 -80.0, 180.0 80.0, -180.0 80.0, -180.0 -80.0))",
-        "geospatial_bounds_crs": "EPSG:4326",
-        "geospatial_bounds_vertical_crs": "EPSG:5831",
-        "geospatial_lat_units": "degrees_north",
-        "geospatial_lon_units": "degrees_east",
-        "geospatial_vertical_min": 0.0,
-        "geospatial_vertical_max": 0.0,
         "time_coverage_start": ds.attrs['time_coverage_start'],
         "time_coverage_end": ds.attrs['time_coverage_end'],
-    }
+    })
 
     ds.attrs = global_attributes
     
@@ -228,14 +477,16 @@ def apply_range_filters(l1b, l2, range_filters):
     if not range_filters:
         return l2
 
-    mask = np.full(l1b.sizes['time'], True)
+    var_masks = [
+        (l1b[var].values >= limits['min']) & (l1b[var].values <= limits['max'])
+        for var, limits in range_filters.items()
+    ]
+    mask = np.logical_and.reduce(var_masks)
     
-    for var, limits in range_filters.items():
-        min_val, max_val = limits['min'], limits['max']
-        var_mask = (l1b[var] >= min_val) & (l1b[var] <= max_val)
-        mask = mask & var_mask
-    
-    return l2.where(mask, np.nan)
+    if mask.all():
+        return l2
+
+    return l2.where(xr.DataArray(mask, dims='time'), np.nan)
 
 
 def add_quality_indices(ds, quality_variables):
@@ -249,20 +500,24 @@ def add_quality_indices(ds, quality_variables):
         (xarray.Dataset): Dataset with added quality variables.
     """
 
-    drop = quality_variables.pop('drop_confidence', None)
+    if not quality_variables:
+        return ds
+
+    drop = quality_variables.get('drop_confidence', False)
     
     for var_name, config in quality_variables.items():
+        if var_name == 'drop_confidence':
+            continue
+
         confidence = ds[config['input']]
         t1, t2 = config['thresholds']
+        attributes = dict(config['attributes'])
+        attributes['flag_values'] = np.array(attributes['flag_values']).astype(np.int8)
         
-        quality = np.select(
-            [confidence < t1, (confidence >= t1) & (confidence < t2), confidence >= t2],
-            [1, 2, 3], default=0
-        ).astype(np.int8)
+        quality = classify_quality(confidence.values, t1, t2)
         
         ds[var_name] = (confidence.dims, quality)
-        ds[var_name].attrs = config['attributes']
-        ds[var_name].attrs['flag_values'] = np.array(ds[var_name].attrs['flag_values']).astype(ds[var_name].dtype)
+        ds[var_name].attrs = attributes
 
         if drop:
             ds = ds.drop_vars(config['input'])
@@ -270,25 +525,109 @@ def add_quality_indices(ds, quality_variables):
     return ds
     
     
-def save_l2(asa_l2, output_path):
+def classify_quality(confidence, t1, t2):
+    """
+    Classify confidence values into quality levels: 1 (bad) below t1, 2 (acceptable) between t1 and t2,
+    3 (good) above t2 and 0 (undefined) for nans.
+    
+    Args:
+        confidence (numpy.ndarray): Confidence values.
+        t1 (float): Lower threshold.
+        t2 (float): Upper threshold.
+    Returns
+        (numpy.ndarray): Quality levels as int8.
+    """
+    if confidence.dtype in (np.float32, np.float64) and (kernel := _get_classify_quality_kernel()) is not None:
+        quality = np.empty(confidence.shape, dtype=np.int8)
+        kernel(confidence, confidence.dtype.type(t1), confidence.dtype.type(t2), quality)
+        return quality
+
+    return np.where(
+        np.isnan(confidence), 0,
+        np.digitize(confidence, np.asarray([t1, t2], dtype=confidence.dtype)) + 1
+    ).astype(np.int8)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_classify_quality_kernel():
+    """
+    Compile the numba quality classification kernel on first use, keeping numba out of the import time.
+
+    Returns:
+        numpy.ufunc: Kernel for float32 and float64 confidences, or None if numba is not installed.
+    """
+    try:
+        from numba import guvectorize
+    except ImportError:
+        return None
+
+    # Signatures are given explicitly so that both kernels are compiled at once rather than per dtype
+    @guvectorize(
+        ["void(float32[:], float32, float32, int8[:])", "void(float64[:], float64, float64, int8[:])"],
+        "(n),(),()->(n)", nopython=True, cache=True
+    )
+    def classify_quality_kernel(confidence, t1, t2, quality):
+        for i in range(confidence.shape[0]):
+            c = confidence[i]
+            if np.isnan(c):
+                quality[i] = 0
+            elif c >= t2:
+                quality[i] = 3
+            elif c >= t1:
+                quality[i] = 2
+            else:
+                quality[i] = 1
+
+    return classify_quality_kernel
+
+
+def save_l2(asa_l2, output_path, chunksizes=None):
     """
     Save L2 data to NetCDF file with proper encoding.
     
     Args:
         asa_l2 (xarray.Dataset): Dataset containing ASAR L2 data.
         output_path (str): path where the NetCDF file will be saved.
+        chunksizes (dict): Maximum HDF5 chunk size along each dimension, dimensions not listed are not split. Defaults to DEFAULT_CHUNKSIZES.
     """    
     # Create directory if it doesn't exist
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     
     # Set up encoding
-    encoding = {"time": {'units': 'Microseconds since 1990-01-01 00:00:00', "_FillValue": 0}}
-    encoding.update({v: {"_FillValue": 1e20} for v in asa_l2.variables if asa_l2[v].dtype == 'float32'})
+    encoding = {"time": {'units': 'Microseconds since 1990-01-01 00:00:00', "_FillValue": 0, "dtype": "int64"}}
+    encoding.update({
+        v: {"_FillValue": FLOAT32_FILL_VALUE, "dtype": "float32"}
+        for v, var in asa_l2.variables.items() if var.dtype == np.float32
+    })
+
+    # Set up chunking and compression
+    chunksizes = chunksizes or DEFAULT_CHUNKSIZES
+    for v, var in asa_l2.variables.items():
+        if var.ndim == 0 or 0 in var.shape:
+            continue
+        encoding.setdefault(v, {}).update({
+            "chunksizes": tuple(min(size, chunksizes.get(dim, size)) for dim, size in var.sizes.items()),
+            **COMPRESSION
+        })
     
     # Save to NetCDF
     asa_l2.to_netcdf(output_path, engine="h5netcdf", encoding=encoding)
 
 
+FLOAT32_FILL_VALUE = np.float32(1e20)
+
+# Chunks of about 1 MB for float32 time series, which fit in the default HDF5 chunk cache
+DEFAULT_CHUNKSIZES = {
+    'time': 262144,
+}
+
+COMPRESSION = {
+    'zlib': True,
+    'complevel': 1,
+    'shuffle': True,
+}
+
+
 FUNCTION_MAP = {
     'xr.Dataset.drop_sel': xr.Dataset.drop_sel,
 }
\ No newline at end of file
@@ -0,0 +1,74 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from asar_seastate_processor.utils import load_config, load_model
+
+PACKAGE_DIR = os.path.join(os.path.dirname(__file__), '..', 'asar_seastate_processor')
+
+
+@pytest.fixture(scope='session', autouse=True)
+def cache_directory(tmp_path_factory):
+    """Keep the JSON copies of configurations out of the user cache directory."""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path_factory.mktemp('cache')))
+        yield
+
+
+@pytest.fixture(scope='session')
+def l1b_filename():
+    """Filename following the L1B naming, with the date at [18:33], the cycle at [43:46] and the pass at [47:52]."""
+    return 'ASA_WVI_1PNPDE1234' + '20110105_123456' + '_00006132' + '_097' + '_12345' + '_00000.SAFE.nc'
+
+
+@pytest.fixture(scope='session')
+def config(tmp_path_factory):
+    config_path = tmp_path_factory.mktemp('config') / 'fv01.yaml'
+    shutil.copy2(os.path.join(PACKAGE_DIR, 'config', 'fv01.yaml'), config_path)
+    return load_config(str(config_path))
+
+
+@pytest.fixture(scope='session')
+def model_path(config):
+    return os.path.join(PACKAGE_DIR, 'models', f'{config["model_name"]}.onnx')
+
+
+@pytest.fixture(scope='session')
+def model(model_path):
+    return load_model(model_path)
+
+
+@pytest.fixture
+def l1b():
+    """Synthetic VV L1B dataset with the variables used by the fv01 configuration."""
+    rng = np.random.default_rng(0)
+    n = 50
+    time = pd.date_range('2011-01-05', periods=n, freq='min')
+    return xr.Dataset(
+        {
+            'sigma0_filt': ('time', rng.uniform(0.05, 1.0, n)),
+            'normalized_variance_filt': ('time', rng.uniform(1.0, 1.7, n)),
+            'incidence': ('time', rng.uniform(22.4, 23.6, n)),
+            'azimuth_cutoff': ('time', rng.uniform(40, 610, n)),
+            'cwave_params': (('time', 'k_gp', 'phi_hf'), rng.normal(size=(n, 4, 5))),
+            'macs_Re': (('time', 'lambda_range_max_macs'), rng.normal(size=(n, 11))),
+            'macs_Im': (('time', 'lambda_range_max_macs'), rng.normal(size=(n, 11))),
+            'land_flag': ('time', np.zeros(n, dtype=bool)),
+        },
+        coords={
+            'time': time,
+            'pol': 'VV',
+            'lambda_range_max_macs': np.arange(15, 26),
+            'k_gp': np.arange(4),
+            'phi_hf': np.arange(5),
+            'longitude': ('time', rng.uniform(-180, 180, n)),
+            'latitude': ('time', rng.uniform(-80, 80, n)),
+            'line': ('time', np.arange(n)),
+            'sample': ('time', np.arange(n)),
+        },
+        attrs={'time_coverage_start': str(time[0]), 'time_coverage_end': str(time[-1])},
+    )
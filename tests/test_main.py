@@ -0,0 +1,117 @@
+import os
+import sys
+import threading
+
+import pytest
+
+import asar_seastate_processor.main as main_module
+from asar_seastate_processor.utils import get_output_path
+
+
+@pytest.fixture
+def l1b_paths(tmp_path, l1b, l1b_filename):
+    """Two valid L1B files with distinct acquisition times."""
+    input_directory = tmp_path / 'input'
+    input_directory.mkdir()
+    l1b = l1b.drop_vars('pol').expand_dims(pol=['VV'])
+    paths = []
+    for acquisition_time in ['123456', '223456']:
+        path = str(input_directory / l1b_filename.replace('123456', acquisition_time))
+        l1b.to_netcdf(path)
+        paths.append(path)
+    return paths
+
+
+@pytest.fixture
+def save_directory(tmp_path):
+    return str(tmp_path / 'output')
+
+
+def run_main(monkeypatch, tmp_path, listing, save_directory, *options):
+    listing_path = tmp_path / 'listing.txt'
+    listing_path.write_text('\n'.join(listing) + '\n')
+    monkeypatch.setattr(sys, 'argv', [
+        'ASAR-L2-wave-processor', '--input_path', str(listing_path),
+        '--save_directory', save_directory, '--file_version', '01', *options
+    ])
+
+    errors = []
+    def target():
+        try:
+            main_module.main()
+        except BaseException as e:
+            errors.append(e)
+
+    # The run must complete even when some files fail
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout=120)
+    assert not thread.is_alive()
+    assert not errors
+
+
+def written_outputs(save_directory, paths):
+    return [os.path.exists(get_output_path(save_directory, path, '01')) for path in paths]
+
+
+def test_main_skips_failing_files(l1b_paths, save_directory, tmp_path, monkeypatch, l1b_filename):
+    missing = str(tmp_path / 'input' / l1b_filename.replace('123456', '000000'))
+    non_standard = str(tmp_path / 'input' / 'l1b.nc')
+    corrupt = str(tmp_path / 'input' / l1b_filename.replace('123456', '111111'))
+    with open(non_standard, 'w') as f:
+        f.write('not a netCDF file')
+    with open(corrupt, 'w') as f:
+        f.write('not a netCDF file')
+
+    run_main(
+        monkeypatch, tmp_path, [l1b_paths[0], missing, non_standard, corrupt, l1b_paths[1]], save_directory
+    )
+    assert written_outputs(save_directory, l1b_paths) == [True, True]
+    assert written_outputs(save_directory, [missing, corrupt]) == [False, False]
+
+
+def test_main_skips_comments(l1b_paths, save_directory, tmp_path, monkeypatch):
+    listing = ['# header', f'{l1b_paths[0]}  # first file', '', f'#{l1b_paths[1]}']
+    run_main(monkeypatch, tmp_path, listing, save_directory)
+    assert written_outputs(save_directory, l1b_paths) == [True, False]
+
+
+def test_main_skips_failing_save(l1b_paths, save_directory, tmp_path, monkeypatch):
+    save_l2 = main_module.save_l2
+    def failing_save_l2(asa_l2, output_path, chunksizes=None):
+        if output_path == get_output_path(save_directory, l1b_paths[0], '01'):
+            raise OSError('disk full')
+        save_l2(asa_l2, output_path, chunksizes)
+    monkeypatch.setattr(main_module, 'save_l2', failing_save_l2)
+
+    run_main(monkeypatch, tmp_path, l1b_paths, save_directory)
+    assert written_outputs(save_directory, l1b_paths) == [False, True]
+
+
+@pytest.mark.parametrize('overwrite', [False, True])
+def test_main_existing_output(l1b_paths, save_directory, tmp_path, monkeypatch, overwrite):
+    existing = get_output_path(save_directory, l1b_paths[0], '01')
+    os.makedirs(os.path.dirname(existing))
+    with open(existing, 'w') as f:
+        f.write('existing')
+
+    run_main(monkeypatch, tmp_path, l1b_paths, save_directory, *(['--overwrite'] if overwrite else []))
+    assert written_outputs(save_directory, l1b_paths) == [True, True]
+    with open(existing, 'rb') as f:
+        assert (f.read() == b'existing') != overwrite
+
+
+def test_main_workers(l1b_paths, save_directory, tmp_path, monkeypatch, l1b_filename):
+    missing = str(tmp_path / 'input' / l1b_filename.replace('123456', '000000'))
+    run_main(monkeypatch, tmp_path, [l1b_paths[0], missing, l1b_paths[1]], save_directory, '--workers', '2')
+    assert written_outputs(save_directory, l1b_paths) == [True, True]
+
+
+@pytest.mark.parametrize('workers', ['0', '-1'])
+def test_parse_args_rejects_invalid_workers(monkeypatch, workers):
+    monkeypatch.setattr(sys, 'argv', [
+        'ASAR-L2-wave-processor', '--input_path', 'listing.txt', '--save_directory', 'output',
+        '--file_version', '01', '--workers', workers
+    ])
+    with pytest.raises(SystemExit):
+        main_module.parse_args()
@@ -0,0 +1,101 @@
+import numpy as np
+import onnxruntime
+import pytest
+import xarray as xr
+
+import asar_seastate_processor.processor as processor
+from asar_seastate_processor.processor import BATCH_SIZE, generate_l2_wave_product, predict_variables
+from asar_seastate_processor.utils import (
+    add_quality_indices, apply_preprocessing, apply_range_filters, format_l2, save_l2
+)
+
+
+def generate_l2(l1b, model, config, filename):
+    l1b = apply_preprocessing(l1b, config['preprocessing'])
+    l2 = generate_l2_wave_product(l1b, model, config['inputs'], config['outputs'], config['kept_variables'])
+    l2 = apply_range_filters(l1b, l2, config['range_filters'])
+    l2 = format_l2(l2, filename, config['attributes'])
+    return add_quality_indices(l2, config['quality_variables'])
+
+
+def test_l2_schema(l1b, model, config, l1b_filename, tmp_path):
+    l2 = generate_l2(l1b, model, config, l1b_filename)
+
+    quality_variables = [v for v in config['quality_variables'] if v != 'drop_confidence']
+    predicted_variables = [v for v in config['outputs'] if not v.endswith('_confidence')]
+    assert set(l2.data_vars) == set(predicted_variables + quality_variables)
+    assert set(l2.coords) == {'time', 'lon', 'lat'}
+    assert dict(l2.sizes) == {'time': l1b.sizes['time']}
+    for var in predicted_variables:
+        assert l2[var].dtype == np.float32
+        assert l2[var].attrs == config['attributes'][var]
+    for var in quality_variables:
+        assert l2[var].dtype == np.int8
+    assert l2.attrs['cycle'] == 97
+    assert l2.attrs['relative_pass_number'] == 12345
+
+    output_path = str(tmp_path / 'l2.nc')
+    save_l2(l2, output_path)
+    with xr.open_dataset(output_path, engine='h5netcdf') as saved:
+        assert set(saved.variables) == set(l2.variables)
+        assert saved['swh'].encoding['dtype'] == np.float32
+        assert saved['swh'].encoding['_FillValue'] == np.float32(1e20)
+        assert saved['swh'].encoding['zlib']
+        assert saved['time'].encoding['dtype'] == np.int64
+
+
+def test_l2_schema_stable_across_files(l1b, model, config, l1b_filename):
+    # The configuration must not be mutated by a first product
+    first = generate_l2(l1b, model, config, l1b_filename)
+    second = generate_l2(l1b, model, config, l1b_filename)
+    assert set(first.variables) == set(second.variables)
+
+
+def test_l2_ref_falls_back_to_working_directory(tmp_path, monkeypatch):
+    xr.Dataset({'swh': ('k', np.arange(3.))}).to_netcdf(tmp_path / 'l2_ref.nc')
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(processor, 'L2_REF_PATH', str(tmp_path / 'missing' / 'l2_ref.nc'))
+    monkeypatch.setattr(processor, '_L2_REF_CACHE', None)
+
+    l2_ref = processor._get_l2_ref()
+    np.testing.assert_array_equal(l2_ref['swh'], np.arange(3.))
+    assert processor._get_l2_ref() is l2_ref
+
+
+@pytest.mark.parametrize('batch_size', [BATCH_SIZE, 100])
+def test_predict_variables_matches_model_run(model, batch_size):
+    rng = np.random.default_rng(0)
+    n = 2 * BATCH_SIZE + 123
+    inputs = [rng.normal(size=(n, )) for _ in range(4)]
+    inputs += [rng.normal(size=(n, 4, 5)), rng.normal(size=(n, 10)), rng.normal(size=(n, 10))]
+
+    X = np.concatenate([a.reshape(n, -1) for a in inputs], axis=1).astype(np.float32)
+    expected = model.run(None, {model.get_inputs()[0].name: X})
+    expected = [r[:, i] for r in expected for i in range(r.shape[-1])]
+
+    res = predict_variables(model, *inputs, batch_size=batch_size)
+
+    assert len(res) == len(expected)
+    for r, e in zip(res, expected):
+        np.testing.assert_array_equal(r, e)
+
+
+def test_predict_variables_empty(model):
+    res = predict_variables(model, np.empty((0, 44)))
+    assert all(r.shape == (0, ) for r in res)
+
+
+def test_predict_variables_plain_session(model, model_path):
+    session = onnxruntime.InferenceSession(model_path)
+    x = np.random.default_rng(0).normal(size=(10, 44))
+    for r, e in zip(predict_variables(session, x), predict_variables(model, x)):
+        np.testing.assert_array_equal(r, e)
+
+
+def test_predict_variables_reuses_binding(model):
+    rng = np.random.default_rng(0)
+    first, second = rng.normal(size=(20, 44)), rng.normal(size=(7, 44))
+    expected = predict_variables(model, second)
+    predict_variables(model, first)
+    for r, e in zip(predict_variables(model, second), expected):
+        np.testing.assert_array_equal(r, e)
@@ -0,0 +1,131 @@
+import json
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+import asar_seastate_processor.utils as utils
+from asar_seastate_processor.utils import _year_and_day_of_year, classify_quality, get_output_path, load_config
+
+
+@pytest.fixture
+def confidence():
+    values = np.random.default_rng(0).normal(-0.6, 0.3, (3, 1000))
+    values[0, :5] = np.nan
+    values[1, :2] = [-0.75, -0.5]
+    return values
+
+
+def reference_quality(values, t1, t2):
+    return np.select(
+        [values < t1, (values >= t1) & (values < t2), values >= t2], [1, 2, 3], default=0
+    ).astype(np.int8)
+
+
+@pytest.mark.parametrize('dtype', [np.float16, np.float32, np.float64])
+def test_classify_quality(confidence, dtype):
+    values = confidence.astype(dtype)
+    quality = classify_quality(values, -0.75, -0.5)
+    assert quality.dtype == np.int8
+    np.testing.assert_array_equal(quality, reference_quality(values, -0.75, -0.5))
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+def test_classify_quality_numba_matches_digitize(confidence, dtype, monkeypatch):
+    pytest.importorskip('numba')
+    values = confidence.astype(dtype)
+    with_numba = classify_quality(values, -0.75, -0.5)
+    monkeypatch.setattr(utils, '_get_classify_quality_kernel', lambda: None)
+    with_digitize = classify_quality(values, -0.75, -0.5)
+    np.testing.assert_array_equal(with_numba, with_digitize)
+    assert (with_numba[0, :5] == 0).all()
+
+
+def test_year_and_day_of_year():
+    day = date(1899, 1, 1)
+    while day < date(2101, 1, 1):
+        assert _year_and_day_of_year(day.strftime('%Y%m%d')) == (day.year, day.timetuple().tm_yday)
+        day += timedelta(days=1)
+
+
+@pytest.mark.parametrize('date_str', ['20080001', '20081301', '20080100', '20080132', '20070229', '20080431'])
+def test_year_and_day_of_year_invalid(date_str):
+    with pytest.raises(ValueError):
+        _year_and_day_of_year(date_str)
+
+
+def test_get_output_path():
+    path = '/data/ASA_WVI_1PNPDE123420081231_123456_00006132_097_12345_00000.SAFE.nc'
+    filename = 'ESACCI-SEASTATE-L2P-ISSP-ENVISAT_ASAR_WV_IFR-20081231T123456-fv01.nc'
+    assert get_output_path('/out', path, '01') == os.path.join('/out', '2008', '366', filename)
+    assert get_output_path('/out', path, '01', date_directories=False) == os.path.join('/out', filename)
+
+
+@pytest.fixture
+def config_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, '_CONFIG_CACHE', {})
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    path = tmp_path / 'config.yaml'
+    path.write_text('a: 1\n')
+    os.utime(path, ns=(2 * 10**18, 2 * 10**18))
+    return str(path)
+
+
+def test_load_config_cache(config_path):
+    config = load_config(config_path)
+    assert config == {'a': 1}
+    assert load_config(config_path) is config
+
+    # Any change of the file invalidates the cache
+    with open(config_path, 'w') as f:
+        f.write('a: 22\n')
+    assert load_config(config_path) == {'a': 22}
+
+
+def test_load_config_json_copy(config_path, tmp_path):
+    load_config(config_path)
+    json_path = utils._get_json_config_path(config_path)
+    assert os.path.exists(json_path)
+    # Nothing is written next to the YAML file
+    assert sorted(os.listdir(tmp_path)) == ['cache', 'config.yaml']
+
+    # The JSON copy is read instead of the YAML file while the YAML file is unchanged
+    with open(json_path) as f:
+        content = json.load(f)
+    content['config'] = {'a': 'from json'}
+    with open(json_path, 'w') as f:
+        json.dump(content, f)
+    utils._CONFIG_CACHE.clear()
+    assert load_config(config_path) == {'a': 'from json'}
+
+
+def test_load_config_json_copy_per_file(config_path, tmp_path):
+    other_path = tmp_path / 'other' / 'config.yaml'
+    other_path.parent.mkdir()
+    other_path.write_text('a: 2\n')
+    os.utime(other_path, ns=(2 * 10**18, 2 * 10**18))
+
+    assert load_config(config_path) == {'a': 1}
+    assert load_config(str(other_path)) == {'a': 2}
+    utils._CONFIG_CACHE.clear()
+    assert load_config(config_path) == {'a': 1}
+
+
+def test_load_config_stale_json_copy(config_path):
+    load_config(config_path)
+    utils._CONFIG_CACHE.clear()
+
+    # YAML deployed with an older preserved modification time and the same size
+    with open(config_path, 'w') as f:
+        f.write('a: 2\n')
+    os.utime(config_path, ns=(10**18, 10**18))
+    assert load_config(config_path) == {'a': 2}
+
+
+def test_load_config_invalid_json_copy(config_path):
+    json_path = utils._get_json_config_path(config_path)
+    os.makedirs(os.path.dirname(json_path))
+    with open(json_path, 'w') as f:
+        f.write('{invalid')
+    assert load_config(config_path) == {'a': 1}